@@ -1,8 +1,11 @@
-from flask import Flask, render_template, request, Response
+from flask import Flask, render_template, request, Response, jsonify
 from lib.searchers.oauth import OAuthSearcher
 from lib.searchers.apikey import APIKeySearcher
 from lib.searchers.scraper import ScraperSearcher
+from lib.searchers.auto import AutoSearcher
+from lib.searchers.throttle import Slots
 from dotenv import load_dotenv
+import json
 import os
 
 app = Flask(__name__)
@@ -14,17 +17,39 @@ searchers = {
     'apikey': APIKeySearcher(os.getenv('YOUTUBE_API_KEY')),
     'scraper': ScraperSearcher()
 }
+# auto routes each call across the backends above
+searchers['auto'] = AutoSearcher(dict(searchers))
+
+# batches run with fewer slots and less parallelism than interactive searches,
+# and the slots are shared by every gunicorn worker through the cache directory
+BATCH_MAX_HANDLES = int(os.getenv('BATCH_MAX_HANDLES', 100))
+BATCH_MAX_TERMS = int(os.getenv('BATCH_MAX_TERMS', 50))
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', 2))
+batch_slots = Slots('batch', 'cache/limits', int(os.getenv('BATCH_SLOTS', 1)))
 
 @app.route('/')
 def home():
     return render_template('index.html')
 
+@app.route('/status')
+def status():
+    # breaker state per backend plus the shared throttle state and recent throttle/backoff events
+    return jsonify({
+        'breakers': searchers['auto'].status(),
+        'throttles': {
+            throttle.name: throttle.status()
+            for throttle in searchers['auto'].throttles()
+        }
+    })
+
 @app.route('/search', methods=['POST'])
 def search():
     data = request.get_json()
     handle = data.get('handle', '').strip()
     term = data.get('term', '').strip()
     searcher_type = data.get('type', 'oauth').strip()  # Default to oauth
+    # 'cache_first' streams cached transcripts before fetching the rest
+    cache_first = data.get('order', 'channel') == 'cache_first'
     
     if searcher_type not in searchers:
         return Response(
@@ -33,9 +58,54 @@ def search():
         )
     
     def generate():
-        yield from searchers[searcher_type].generate_results(handle, term)
+        yield from searchers[searcher_type].generate_results(handle, term, cache_first)
 
     return Response(generate(), mimetype='text/plain')
 
+@app.route('/batch', methods=['POST'])
+def batch():
+    data = request.get_json()
+    handles = data.get('handles', [])
+    terms = data.get('terms', [])
+    searcher_type = data.get('type', 'auto').strip()
+
+    if not all(isinstance(v, list) and all(isinstance(s, str) for s in v) for v in (handles, terms)):
+        return Response(
+            '{"type": "error", "error": "handles and terms must be lists of strings"}\n',
+            mimetype='text/plain'
+        )
+    handles = [h.strip() for h in handles]
+    terms = [t.strip() for t in terms]
+
+    if searcher_type not in searchers:
+        return Response(
+            '{"type": "error", "error": "Invalid searcher type"}\n',
+            mimetype='text/plain'
+        )
+    if len(handles) > BATCH_MAX_HANDLES or len(terms) > BATCH_MAX_TERMS:
+        return Response(
+            json.dumps({
+                'type': 'error',
+                'error': f'Batches are limited to {BATCH_MAX_HANDLES} handles and {BATCH_MAX_TERMS} terms'
+            }) + '\n',
+            mimetype='text/plain'
+        )
+
+    slot = batch_slots.acquire()
+    if not slot:
+        return Response(
+            '{"type": "error", "error": "Too many batches running, try again later"}\n',
+            status=429,
+            mimetype='text/plain'
+        )
+
+    def generate():
+        yield from searchers[searcher_type].generate_batch_results(handles, terms, BATCH_CONCURRENCY)
+
+    response = Response(generate(), mimetype='text/plain')
+    # runs when the stream finishes or the client disconnects
+    response.call_on_close(lambda: batch_slots.release(slot))
+    return response
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -1,5 +1,5 @@
 from lib.searchers.base import BaseSearcher
-from googleapiclient.discovery import build
+from lib.searchers.throttle import Throttle
 from googleapiclient.errors import HttpError
 import requests
 import json
@@ -7,11 +7,12 @@ import json
 class APIKeySearcher(BaseSearcher):
     def __init__(self, api_key):
         super().__init__()
-        self.youtube = build('youtube', 'v3', developerKey=api_key)
+        self.throttle = Throttle('apikey', self.cache.limits_dir, rate=5, burst=10)
+        self.youtube = self.replay.build_youtube(developer_key=api_key)
     
-    def search_channel(self, handle):
+    def resolve_channel(self, handle):
         try:
-            # First get channel details using handle
+            # Get channel details using handle
             request = self.youtube.search().list(
                 part="snippet",
                 q=handle,
@@ -23,10 +24,15 @@ class APIKeySearcher(BaseSearcher):
             if not response['items']:
                 raise ValueError(f"No channel found for handle {handle}")
             
-            channel_id = response['items'][0]['id']['channelId']
+            return response['items'][0]['id']['channelId']
             
-            # Get all video IDs from the channel
-            videos = []
+        except HttpError as e:
+            raise ValueError(f"YouTube API error: {str(e)}")
+    
+    def list_video_pages(self, handle, channel_id):
+        try:
+            # Yield video IDs from the channel one API page at a time
+            listed = 0
             next_page_token = None
             
             while True:
@@ -40,19 +46,14 @@ class APIKeySearcher(BaseSearcher):
                 )
                 playlist_response = playlist_request.execute()
                 
-                for item in playlist_response['items']:
-                    videos.append(item['id']['videoId'])
+                page = [item['id']['videoId'] for item in playlist_response['items']]
+                listed += len(page)
+                yield page
                 
                 next_page_token = playlist_response.get('nextPageToken')
-                if not next_page_token or len(videos) >= 1000:
+                if not next_page_token or listed >= 1000:
                     break
             
-            return {
-                'handle': handle,
-                'channel_id': channel_id,
-                'video_list': videos
-            }
-            
         except HttpError as e:
             raise ValueError(f"YouTube API error: {str(e)}")
     
@@ -0,0 +1,209 @@
+from lib.searchers.base import BaseSearcher
+from lib.searchers.throttle import is_throttled, is_backend_error
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import deque
+import threading
+import time
+
+class CircuitBreaker:
+    """Opens on repeated errors or a quota response, then lets one probe through after a cooldown"""
+    def __init__(self, failure_threshold=5, cooldown=30, quota_cooldown=300):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.quota_cooldown = quota_cooldown
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0
+        self.open_for = 0
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def _cooled_down(self):
+        return time.monotonic() - self.opened_at >= self.open_for
+
+    def available(self):
+        with self.lock:
+            return self.state == 'closed' or (not self.probing and self._cooled_down())
+
+    def allow(self):
+        with self.lock:
+            if self.state == 'closed':
+                return True
+            if not self.probing and self._cooled_down():
+                # half open: a single request probes for recovery
+                self.state = 'half_open'
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.state = 'closed'
+            self.failures = 0
+            self.probing = False
+
+    def record_failure(self, quota=False):
+        with self.lock:
+            self.failures += 1
+            self.probing = False
+            if quota:
+                self._open(self.quota_cooldown)
+            elif self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self._open(self.cooldown)
+
+    def _open(self, seconds):
+        self.state = 'open'
+        self.opened_at = time.monotonic()
+        self.open_for = seconds
+
+class Backend:
+    def __init__(self, name, searcher, window=100):
+        self.name = name
+        self.searcher = searcher
+        self.breaker = CircuitBreaker()
+        self.latencies = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def record_latency(self, seconds):
+        with self.lock:
+            self.latencies.append(seconds)
+
+    def percentile(self, p):
+        with self.lock:
+            samples = sorted(self.latencies)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * p / 100))
+        return samples[index]
+
+    def status(self):
+        return {
+            'state': self.breaker.state,
+            'failures': self.breaker.failures,
+            'samples': len(self.latencies),
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+        }
+
+class AutoSearcher(BaseSearcher):
+    """Routes each call to the fastest healthy backend and hedges slow video fetches"""
+    def __init__(self, searchers, hedge_percentile=95, default_hedge_delay=5, min_samples=5, max_workers=8):
+        super().__init__()
+        self.backends = {name: Backend(name, searcher) for name, searcher in searchers.items()}
+        self.hedge_percentile = hedge_percentile
+        self.default_hedge_delay = default_hedge_delay
+        self.min_samples = min_samples
+        # separate from self.pool so hedged calls never queue behind the fetches waiting on them
+        self.backend_pool = ThreadPoolExecutor(max_workers=max_workers)
+
+    def _ranked(self):
+        # backends without samples sort first so they get measured
+        healthy = [b for b in self.backends.values() if b.breaker.available()]
+        return sorted(healthy, key=lambda b: b.percentile(50) or 0)
+
+    def _hedge_delay(self, backend):
+        if len(backend.latencies) < self.min_samples:
+            return self.default_hedge_delay
+        return backend.percentile(self.hedge_percentile)
+
+    def _call(self, backend, method, *args):
+        start = time.monotonic()
+        try:
+            result = getattr(backend.searcher, method)(*args)
+        except Exception as e:
+            if is_backend_error(e):
+                backend.breaker.record_failure(quota=is_throttled(e))
+            else:
+                # the backend answered, the video or channel just isn't there
+                backend.breaker.record_success()
+            raise
+        if method == 'fetch_video':
+            # hedge delays are tuned on video fetches only, a channel lookup has its own latency
+            backend.record_latency(time.monotonic() - start)
+        backend.breaker.record_success()
+        return result
+
+    def _watch_pages(self, backend, pages):
+        # pages are listed lazily, after open_channel has returned, so their errors count here
+        try:
+            yield from pages
+        except Exception as e:
+            if is_backend_error(e):
+                backend.breaker.record_failure(quota=is_throttled(e))
+            raise
+
+    def _launch(self, candidates, pending, handle, video_id, background=False):
+        while candidates:
+            backend = candidates.pop(0)
+            if backend.breaker.allow():
+                # no retries on a throttled backend, failing over to the next one is quicker
+                future = self.backend_pool.submit(self._call, backend, 'fetch_video', handle, video_id, background, 0)
+                pending[future] = backend
+                return backend
+        return None
+
+    def status(self):
+        return {name: backend.status() for name, backend in self.backends.items()}
+
+    # each backend throttles itself, so auto only routes
+    def fetch_video(self, handle, video_id, background=False, retries=0):
+        return self.search_video(handle, video_id, background)
+
+    def throttles(self):
+        return [throttle for backend in self.backends.values() for throttle in backend.searcher.throttles()]
+
+    def concurrency(self):
+        return max([backend.searcher.concurrency() for backend in self._ranked()] or [1])
+
+    def open_channel(self, handle):
+        # the backend that resolves the channel also lists its pages
+        errors = []
+        for backend in self._ranked():
+            if not backend.breaker.allow():
+                continue
+            try:
+                channel_id, pages = self._call(backend, 'open_channel', handle)
+                return channel_id, self._watch_pages(backend, pages)
+            except Exception as e:
+                if not is_backend_error(e):
+                    raise
+                errors.append(f'{backend.name}: {str(e)}')
+        if not errors:
+            raise ValueError("No healthy backend available")
+        raise ValueError(f"All backends failed: {'; '.join(errors)}")
+
+    def search_video(self, handle, video_id, background=False):
+        candidates = self._ranked()
+        pending = {}
+        errors = []
+
+        primary = self._launch(candidates, pending, handle, video_id, background)
+        if not primary:
+            raise ValueError("No healthy backend available")
+
+        hedged = False
+        while pending:
+            timeout = None if hedged else self._hedge_delay(primary)
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # primary is slower than its usual tail latency, race a second backend
+                hedged = True
+                self._launch(candidates, pending, handle, video_id, background)
+                continue
+
+            for future in done:
+                backend = pending.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    # another backend won't find a video that doesn't exist either
+                    if not is_backend_error(e):
+                        raise
+                    errors.append(f'{backend.name}: {str(e)}')
+
+            if not pending:
+                # everything in flight failed, fail over to the next backend
+                primary = self._launch(candidates, pending, handle, video_id, background)
+                hedged = False
+
+        raise ValueError(f"All backends failed: {'; '.join(errors)}")
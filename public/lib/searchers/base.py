@@ -1,17 +1,29 @@
 from flask import Flask, render_template, request, jsonify, Response
+from lib.searchers.throttle import is_throttled
+from lib.searchers.replay import Replay
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from itertools import chain
 import json
 import os
+import queue
+import threading
 import time
 from datetime import timedelta
 
+# yielded by a non-blocking id source when the next ids haven't been listed yet
+NOT_LISTED = object()
+
 class Cache:
     def __init__(self):
         self.cache_dir = 'cache'
         self.channels_dir = 'cache/channels'
         self.videos_dir = 'cache/videos'
+        self.limits_dir = 'cache/limits'
         os.makedirs(self.cache_dir, exist_ok=True)
         os.makedirs(self.channels_dir, exist_ok=True)
         os.makedirs(self.videos_dir, exist_ok=True)
+        os.makedirs(self.limits_dir, exist_ok=True)
     
     def get_channel_path(self, handle):
         return os.path.join(self.channels_dir, f'{handle}.json')
@@ -34,6 +46,9 @@ class Cache:
         with open(cache_path, 'w', encoding='utf-8') as f:
             json.dump(cache_data, f, ensure_ascii=False, indent=2)
     
+    def has_video(self, video_id):
+        return os.path.exists(self.get_video_path(video_id))
+
     # video: video_id, channel, title, published_at, transcript
     def get_video_cache(self, video_id):
         cache_path = self.get_video_path(video_id)
@@ -53,12 +68,233 @@ class BaseSearcher:
     def __init__(self):
         self.language_codes = ['en', 'en-GB', 'en-US']
         self.cache = Cache()
+        # subclasses that talk to YouTube set a Throttle for their backend
+        self.throttle = None
+        self.pool = ThreadPoolExecutor(max_workers=8)
+        # record live responses, or serve them back from standin.py, for load testing
+        self.replay = Replay(os.getenv('YOUTUBE_RECORD_DIR'), os.getenv('YOUTUBE_STANDIN_URL'))
     
     # each instance of BaseSearcher should implement these methods
-    # def search_channel(self, handle)
+    # def resolve_channel(self, handle) -> channel_id
+    # def list_video_pages(self, handle, channel_id) -> generator of video id lists
     # def search_video(self, handle, video_id)
 
-    def generate_results(self, handle, term):
+    def open_channel(self, handle):
+        channel_id = self._throttled(self.resolve_channel, handle)
+        return channel_id, self._throttled_pages(self.list_video_pages(handle, channel_id))
+
+    def fetch_channel_pages(self, handle):
+        # pages of video ids as they are listed, so searching can start on the first one
+        channel = self.cache.get_channel_cache(handle)
+        if channel:
+            return iter([channel['video_list']])
+        channel_id, pages = self.open_channel(handle)
+        return self._read_ahead(self._save_channel_pages(handle, channel_id, pages))
+
+    def _throttled_pages(self, pages):
+        while True:
+            page = self._throttled(next, pages, None)
+            if page is None:
+                return
+            yield page
+
+    def _save_channel_pages(self, handle, channel_id, pages):
+        video_list = []
+        for page in pages:
+            video_list.extend(page)
+            yield page
+        # only a complete listing goes in the cache
+        self.cache.save_channel_cache(handle, {
+            'handle': handle,
+            'channel_id': channel_id,
+            'video_list': video_list
+        })
+
+    def _read_ahead(self, pages):
+        # lists the next page in the background while the current one is searched
+        future = self.pool.submit(next, pages, None)
+        while True:
+            page = future.result()
+            if page is None:
+                return
+            future = self.pool.submit(next, pages, None)
+            yield page
+
+    def fetch_video(self, handle, video_id, background=False, retries=2):
+        # background fetches leave a throttle slot free for interactive searches
+        return self._throttled(self.search_video, handle, video_id, reserve=1 if background else 0, retries=retries)
+
+    def _throttled(self, method, *args, reserve=0, retries=0):
+        if not self.throttle:
+            return method(*args)
+        for attempt in range(retries + 1):
+            with self.throttle.slot(reserve):
+                try:
+                    result = method(*args)
+                except Exception as e:
+                    if not is_throttled(e):
+                        raise
+                    self.throttle.record_throttle(str(e))
+                    if attempt == retries:
+                        raise
+                    # the slot is released here and the next one waits out the backoff window
+                    continue
+                self.throttle.record_success()
+                return result
+
+    def throttles(self):
+        return [self.throttle] if self.throttle else []
+
+    def concurrency(self):
+        return int(self.throttle.limit) if self.throttle else 1
+
+    def _iter_videos(self, handle, video_ids, concurrency=None, background=False, ready=None, wakeup=None):
+        # yields (video_id, video, error, fetched) in list order, fetching uncached videos ahead in parallel;
+        # results that show up in `ready` are yielded ahead of the window. With `wakeup`, video_ids
+        # may yield NOT_LISTED instead of blocking, and wakeup is set whenever more ids or ready
+        # results arrive or a fetch finishes.
+        ready = ready if ready is not None else deque()
+        video_ids = iter(video_ids)
+        window = deque()
+        fetching = 0
+        exhausted = False
+        listing_error = None
+        try:
+            while True:
+                if wakeup:
+                    wakeup.clear()
+                limit = self.concurrency()
+                if background:
+                    limit = max(1, limit - 1)
+                if concurrency:
+                    limit = min(limit, concurrency)
+                # don't wait on more of the listing while the head of the window is ready to go
+                while not exhausted and fetching < limit and not ready and not (window and self._ready(window[0])):
+                    try:
+                        video_id = next(video_ids, None)
+                    except Exception as e:
+                        # finish what was already listed before reporting it
+                        listing_error = e
+                        video_id = None
+                    if video_id is None:
+                        exhausted = True
+                    elif video_id is NOT_LISTED:
+                        break
+                    elif self.cache.has_video(video_id):
+                        window.append((video_id, None))
+                    else:
+                        window.append((video_id, self._submit(handle, video_id, background, wakeup)))
+                        fetching += 1
+                if ready:
+                    while ready:
+                        yield ready.popleft()
+                    continue
+                if not window:
+                    if wakeup and not exhausted:
+                        wakeup.wait()
+                        continue
+                    if listing_error:
+                        raise listing_error
+                    return
+                if wakeup and not exhausted and not self._ready(window[0]):
+                    # more of the listing may arrive before the head of the window finishes
+                    wakeup.wait()
+                    continue
+
+                video_id, future = window.popleft()
+                video = None
+                if future is None:
+                    video = self.cache.get_video_cache(video_id)
+                    if not video:
+                        future = self._submit(handle, video_id, background, wakeup)
+                        fetching += 1
+                if future is not None:
+                    try:
+                        video = future.result()
+                        self.cache.save_video_cache(video_id, video)
+                    except Exception as e:
+                        yield video_id, None, e, True
+                        continue
+                    finally:
+                        fetching -= 1
+                yield video_id, video, None, future is not None
+        finally:
+            # the client went away, don't keep fetching for it
+            for _, future in window:
+                if future is not None:
+                    future.cancel()
+
+    def _submit(self, handle, video_id, background, wakeup):
+        future = self.pool.submit(self.fetch_video, handle, video_id, background)
+        if wakeup:
+            future.add_done_callback(lambda _: wakeup.set())
+        return future
+
+    def _ready(self, entry):
+        _, future = entry
+        return future is None or future.done()
+
+    def _iter_scheduled(self, handle, pages, cache_first=False, concurrency=None):
+        if not cache_first:
+            yield from self._iter_videos(handle, chain.from_iterable(pages), concurrency)
+            return
+        # a background scan streams cached videos as soon as each page is listed, without waiting
+        # on fetch capacity; uncached ids share one fetch pipeline across all pages.
+        # The client restores channel order by published_at.
+        cached = deque()
+        uncached = queue.Queue()
+        wakeup = threading.Event()
+        stopped = threading.Event()
+
+        def scan():
+            try:
+                for page in pages:
+                    if stopped.is_set():
+                        return
+                    for video_id in page:
+                        video = self.cache.get_video_cache(video_id) if self.cache.has_video(video_id) else None
+                        if video:
+                            cached.append((video_id, video, None, False))
+                        else:
+                            uncached.put(video_id)
+                    wakeup.set()
+            except Exception as e:
+                uncached.put(e)
+            finally:
+                uncached.put(None)
+                wakeup.set()
+
+        def uncached_ids():
+            while True:
+                try:
+                    video_id = uncached.get_nowait()
+                except queue.Empty:
+                    yield NOT_LISTED
+                    continue
+                if isinstance(video_id, Exception):
+                    raise video_id
+                if video_id is None:
+                    return
+                yield video_id
+
+        self.pool.submit(scan)
+        try:
+            yield from self._iter_videos(handle, uncached_ids(), concurrency, ready=cached, wakeup=wakeup)
+        finally:
+            stopped.set()
+
+    def _throttle_events(self, seqs):
+        events = []
+        for throttle in self.throttles():
+            for event in throttle.events_since(seqs.get(throttle.name, 0)):
+                seqs[throttle.name] = event['seq']
+                events.append(json.dumps({
+                    'type': event['event'],
+                    **event
+                }) + '\n')
+        return events
+
+    def generate_results(self, handle, term, cache_first=False):
         if not handle.startswith('@'):
             handle = '@' + handle
 
@@ -69,45 +305,48 @@ class BaseSearcher:
             }) + '\n'
             return
 
-        channel = self.cache.get_channel_cache(handle)
-        if not channel:
-            try:
-                channel = self.search_channel(handle)
-                self.cache.save_channel_cache(handle, channel)
-            except Exception as e:
+        # only report throttle events that happen during this search
+        seqs = {throttle.name: throttle.last_seq() for throttle in self.throttles()}
+
+        try:
+            pages = self.fetch_channel_pages(handle)
+        except Exception as e:
+            yield json.dumps({
+                'type': 'error',
+                'error': f'Channel not found: {str(e)}'
+            }) + '\n'
+            return
+
+        try:
+            yield from self._search_pages(handle, term, pages, cache_first, seqs)
+        except Exception as e:
+            yield json.dumps({
+                'type': 'error',
+                'error': f'Channel listing stopped early: {str(e)}'
+            }) + '\n'
+
+    def _search_pages(self, handle, term, pages, cache_first, seqs):
+        videos_processed = 0
+        videos_cached = 0
+        videos_fetched = 0
+        matches_found = 0
+        for video_id, video, error, fetched in self._iter_scheduled(handle, pages, cache_first):
+            yield from self._throttle_events(seqs)
+            if error:
                 yield json.dumps({
                     'type': 'error',
-                    'error': f'Channel not found: {str(e)}'
+                    'error': f'Video not found: {str(error)}'
                 }) + '\n'
-                return
-        
-        videos_processed = 0
-        matches_found = 0
-        for video_id in channel['video_list']:
-            video = self.cache.get_video_cache(video_id)
-            if not video:
-                try:
-                    video = self.search_video(handle, video_id)
-                    self.cache.save_video_cache(video_id, video)
-                except Exception as e:
-                    yield json.dumps({
-                        'type': 'error',
-                        'error': f'Video not found: {str(e)}'
-                    }) + '\n'
-                    continue
+                continue
             if not video:
                 continue
             videos_processed += 1
+            if fetched:
+                videos_fetched += 1
+            else:
+                videos_cached += 1
 
-            # search term in transcript
-            matches = []
-            for line in video['transcript']:
-                if term.lower() in line['text'].lower():
-                    matches.append({
-                        'text': line['text'],
-                        'timestamp': line['start'],
-                        'timestamp_formatted': self._format_timestamp(line['start'])
-                    })
+            matches = self._match_terms(video, [term])[term]
             if matches:
                 matches_found += 1
                 result = {
@@ -124,8 +363,111 @@ class BaseSearcher:
             yield json.dumps({
                 'type': 'progress',
                 'videos_processed': videos_processed,
+                'videos_cached': videos_cached,
+                'videos_fetched': videos_fetched,
                 'matches_found': matches_found
             }) + '\n'
-                    
+
+    def generate_batch_results(self, handles, terms, concurrency=None):
+        handles = list(dict.fromkeys('@' + h.lstrip('@') for h in handles if h.strip('@ ')))
+        terms = list(dict.fromkeys(t for t in terms if t))
+
+        if not handles or not terms:
+            yield json.dumps({
+                'type': 'error',
+                'error': 'Please provide at least one channel handle and one search term'
+            }) + '\n'
+            return
+
+        seqs = {throttle.name: throttle.last_seq() for throttle in self.throttles()}
+
+        seen = set()
+        videos_processed = 0
+        matches_found = 0
+        for channels_processed, handle in enumerate(handles):
+            try:
+                pages = self.fetch_channel_pages(handle)
+            except Exception as e:
+                yield json.dumps({
+                    'type': 'error',
+                    'handle': handle,
+                    'error': f'Channel not found: {str(e)}'
+                }) + '\n'
+                continue
+
+            # a video listed twice is only fetched and searched once per batch
+            video_ids = self._unseen(pages, seen)
+
+            try:
+                for video_id, video, error, _ in self._iter_videos(handle, video_ids, concurrency, background=True):
+                    yield from self._throttle_events(seqs)
+                    if error:
+                        yield json.dumps({
+                            'type': 'error',
+                            'handle': handle,
+                            'error': f'Video not found: {str(error)}'
+                        }) + '\n'
+                        continue
+                    if not video:
+                        continue
+                    videos_processed += 1
+
+                    matches = {t: m for t, m in self._match_terms(video, terms).items() if m}
+                    if matches:
+                        matches_found += 1
+                        yield json.dumps({
+                            'type': 'match',
+                            'handle': handle,
+                            'data': {
+                                'title': video['title'],
+                                'video_id': video['video_id'],
+                                'published_at': video['published_at'],
+                                'matches': matches
+                            }
+                        }) + '\n'
+
+                    yield json.dumps({
+                        'type': 'progress',
+                        'handle': handle,
+                        'channels_processed': channels_processed,
+                        'videos_processed': videos_processed,
+                        'matches_found': matches_found
+                    }) + '\n'
+            except Exception as e:
+                yield json.dumps({
+                    'type': 'error',
+                    'handle': handle,
+                    'error': f'Channel listing stopped early: {str(e)}'
+                }) + '\n'
+
+        yield json.dumps({
+            'type': 'complete',
+            'channels_processed': len(handles),
+            'videos_processed': videos_processed,
+            'matches_found': matches_found
+        }) + '\n'
+
+    def _unseen(self, pages, seen):
+        for page in pages:
+            for video_id in page:
+                if video_id not in seen:
+                    seen.add(video_id)
+                    yield video_id
+
+    def _match_terms(self, video, terms):
+        # one pass over the transcript for every term
+        terms = {term: term.lower() for term in terms}
+        matches = {term: [] for term in terms}
+        for line in video['transcript']:
+            text = line['text'].lower()
+            for term, lowered in terms.items():
+                if lowered in text:
+                    matches[term].append({
+                        'text': line['text'],
+                        'timestamp': line['start'],
+                        'timestamp_formatted': self._format_timestamp(line['start'])
+                    })
+        return matches
+
     def _format_timestamp(self, seconds):
         return str(timedelta(seconds=int(seconds))).split('.')[0].zfill(8) 
\ No newline at end of file
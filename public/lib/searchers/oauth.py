@@ -1,8 +1,8 @@
 from lib.searchers.base import BaseSearcher
+from lib.searchers.throttle import Throttle
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import os
 import pickle
@@ -10,6 +10,7 @@ import pickle
 class OAuthSearcher(BaseSearcher):
     def __init__(self):
         super().__init__()
+        self.throttle = Throttle('oauth', self.cache.limits_dir, rate=5, burst=10)
         self.youtube = self._get_authenticated_service()
     
     def _get_authenticated_service(self):
@@ -34,11 +35,11 @@ class OAuthSearcher(BaseSearcher):
             with open('token.pickle', 'wb') as token:
                 pickle.dump(creds, token)
         
-        return build('youtube', 'v3', credentials=creds)
+        return self.replay.build_youtube(credentials=creds)
     
-    def search_channel(self, handle):
+    def resolve_channel(self, handle):
         try:
-            # First get channel details using handle
+            # Get channel details using handle
             request = self.youtube.search().list(
                 part="snippet",
                 q=handle,
@@ -50,10 +51,15 @@ class OAuthSearcher(BaseSearcher):
             if not response['items']:
                 raise ValueError(f"No channel found for handle {handle}")
             
-            channel_id = response['items'][0]['id']['channelId']
+            return response['items'][0]['id']['channelId']
             
-            # Get all video IDs from the channel
-            videos = []
+        except HttpError as e:
+            raise ValueError(f"YouTube API error: {str(e)}")
+    
+    def list_video_pages(self, handle, channel_id):
+        try:
+            # Yield video IDs from the channel one API page at a time
+            listed = 0
             next_page_token = None
             
             while True:
@@ -67,19 +73,14 @@ class OAuthSearcher(BaseSearcher):
                 )
                 playlist_response = playlist_request.execute()
                 
-                for item in playlist_response['items']:
-                    videos.append(item['id']['videoId'])
+                page = [item['id']['videoId'] for item in playlist_response['items']]
+                listed += len(page)
+                yield page
                 
                 next_page_token = playlist_response.get('nextPageToken')
-                if not next_page_token or len(videos) >= 1000:
+                if not next_page_token or listed >= 1000:
                     break
             
-            return {
-                'handle': handle,
-                'channel_id': channel_id,
-                'video_list': videos
-            }
-            
         except HttpError as e:
             raise ValueError(f"YouTube API error: {str(e)}")
     
@@ -0,0 +1,138 @@
+from googleapiclient.discovery import build
+from googleapiclient.http import HttpRequest, build_http, DEFAULT_HTTP_TIMEOUT_SEC
+from urllib.parse import urlsplit, parse_qsl, urlencode
+import google_auth_httplib2
+import hashlib
+import httplib2
+import json
+import os
+import requests
+import threading
+
+# query params that differ between the live service and the stand-in but not the response
+IGNORED_PARAMS = {'key', 'access_token', 'quotaUser'}
+
+def request_key(method, url):
+    """Identifies a request by method, path and sorted query, ignoring the host"""
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in IGNORED_PARAMS)
+    return f'{method.upper()} {parts.path}?{urlencode(query)}'
+
+def ytdlp_key(url, process=True):
+    return f'YTDLP {url}' if process else f'YTDLP-FLAT {url}'
+
+class Recording:
+    """A directory of captured responses, one json file per request key"""
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def get_path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    def save(self, key, status, content_type, body):
+        if isinstance(body, bytes):
+            body = body.decode('utf-8', errors='replace')
+        with open(self.get_path(key), 'w', encoding='utf-8') as f:
+            json.dump({
+                'key': key,
+                'status': status,
+                'content_type': content_type,
+                'body': body
+            }, f, ensure_ascii=False)
+
+    def load(self, key):
+        try:
+            with open(self.get_path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except:
+            return None
+
+class RecordingHttp(httplib2.Http):
+    """httplib2 transport for the Data API client that saves every response it sees"""
+    def __init__(self, recording, **kwargs):
+        super().__init__(**kwargs)
+        self.recording = recording
+
+    def request(self, uri, method='GET', body=None, headers=None, *args, **kwargs):
+        response, content = super().request(uri, method, body, headers, *args, **kwargs)
+        self.recording.save(request_key(method, uri), response.status, response.get('content-type'), content)
+        return response, content
+
+class Replay:
+    """Routes what the searchers fetch from YouTube through a recording or a local stand-in.
+
+    With record_dir set, live responses are captured into that directory. With
+    standin_url set, the Data API, yt-dlp extraction and caption downloads are
+    all served by standin.py instead of YouTube. With neither, everything goes
+    to YouTube as usual.
+    """
+    def __init__(self, record_dir=None, standin_url=None):
+        self.recording = Recording(record_dir) if record_dir else None
+        self.standin_url = standin_url.rstrip('/') if standin_url else None
+
+    def build_youtube(self, credentials=None, developer_key=None):
+        # the fetch threads share one service but httplib2.Http isn't thread-safe,
+        # so each thread sends its requests over its own http
+        local = threading.local()
+
+        def new_http():
+            # keep the client's default timeout, a hung request would hold a shared throttle slot forever
+            if self.recording and not self.standin_url:
+                http = RecordingHttp(self.recording, timeout=DEFAULT_HTTP_TIMEOUT_SEC)
+            else:
+                http = build_http()
+            if credentials:
+                http = google_auth_httplib2.AuthorizedHttp(credentials, http=http)
+            return http
+
+        def build_request(http, *args, **kwargs):
+            if not hasattr(local, 'http'):
+                local.http = new_http()
+            return HttpRequest(local.http, *args, **kwargs)
+
+        client_options = {'api_endpoint': self.standin_url + '/'} if self.standin_url else None
+        return build('youtube', 'v3', http=new_http(), developerKey=developer_key,
+                     client_options=client_options, requestBuilder=build_request)
+
+    def extract_info(self, ydl, url, process=True):
+        if self.standin_url:
+            response = requests.get(f'{self.standin_url}/ytdlp', params={'url': url, 'process': int(process)},
+                                    timeout=DEFAULT_HTTP_TIMEOUT_SEC)
+            if response.status_code != 200:
+                # shaped like yt-dlp's own errors so throttle detection sees them
+                raise ValueError(f'HTTP Error {response.status_code}: {response.reason}')
+            return response.json()
+
+        info = ydl.extract_info(url, download=False, process=process)
+        if not self.recording or not info:
+            return info
+        if process:
+            self.recording.save(ytdlp_key(url), 200, 'application/json', json.dumps(ydl.sanitize_info(info)))
+            return info
+        # flat listings are lazy, record the entries as they are consumed
+        return {**info, 'entries': self._record_entries(url, info, ydl)}
+
+    def _record_entries(self, url, info, ydl):
+        entries = []
+        try:
+            for entry in info.get('entries') or []:
+                entries.append(entry)
+                yield entry
+        finally:
+            recorded = ydl.sanitize_info({**info, 'entries': entries})
+            self.recording.save(ytdlp_key(url, process=False), 200, 'application/json', json.dumps(recorded))
+
+    def get(self, url):
+        if self.standin_url:
+            response = requests.get(f'{self.standin_url}/fetch', params={'url': url}, timeout=DEFAULT_HTTP_TIMEOUT_SEC)
+        else:
+            response = requests.get(url, timeout=DEFAULT_HTTP_TIMEOUT_SEC)
+            if self.recording:
+                self.recording.save(request_key('GET', url), response.status_code,
+                                    response.headers.get('content-type'), response.content)
+        if response.status_code == 429 or response.status_code >= 500:
+            # same shape as extract_info so throttles and breakers see caption errors too;
+            # other 4xx are left to the caller, a stale format URL shouldn't fail the video
+            raise ValueError(f'HTTP Error {response.status_code}: {response.reason}')
+        return response
@@ -1,15 +1,18 @@
 from lib.searchers.base import BaseSearcher
+from lib.searchers.throttle import Throttle
 import yt_dlp
 import json
 import os
 import requests
 from xml.etree import ElementTree
 import re
+from itertools import islice
 from typing import List, Dict
 
 class ScraperSearcher(BaseSearcher):
     def __init__(self):
         super().__init__()
+        self.throttle = Throttle('scraper', self.cache.limits_dir, rate=1, burst=3)
         self._ensure_cookie_file()
         self.ydl_opts = {
             'quiet': True,
@@ -35,42 +38,42 @@ class ScraperSearcher(BaseSearcher):
             with open('cookies.txt', 'w') as f:
                 f.write('# Netscape HTTP Cookie File')
 
-    def search_channel(self, handle):
+    def resolve_channel(self, handle):
         clean_handle = handle[1:]
 
         try:
             with yt_dlp.YoutubeDL(self.ydl_opts) as ydl:
                 channel_url = f'https://www.youtube.com/{clean_handle}'
-                channel_info = ydl.extract_info(channel_url, download=False)
-                channel_id = channel_info.get('channel_id')
+                channel_info = self.replay.extract_info(ydl, channel_url)
+                return channel_info.get('channel_id')
         except Exception as e:
             raise ValueError(f"No channel found: {str(e)}")
-        
+
+    def list_video_pages(self, handle, channel_id, page_size=30):
+        clean_handle = handle[1:]
+
         try:
             ydl_opts = {
                 **self.ydl_opts,
                 'extract_flat': 'in_playlist',
                 'playlistreverse': False,
-                'playlistend': 1000,
                 'sleep_interval': 1,
                 'max_sleep_interval': 5,
             }
             videos_url = f'https://www.youtube.com/{clean_handle}/videos'
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                playlist = ydl.extract_info(videos_url, download=False)
-                if playlist and playlist.get('entries'):
-                    videos = [entry['id'] for entry in playlist['entries']]
-                else:
-                    videos = []
+                # unprocessed, the tab's entries are a lazy generator that walks
+                # YouTube's continuation pages as they are consumed
+                playlist = self.replay.extract_info(ydl, videos_url, process=False)
+                entries = islice(playlist.get('entries') or [], 1000) if playlist else iter([])
+                while True:
+                    page = [entry['id'] for entry in islice(entries, page_size)]
+                    if not page:
+                        break
+                    yield page
         except Exception as e:
             raise ValueError(f"No videos found: {str(e)}")
         
-        return {
-            'handle': handle,
-            'channel_id': channel_id,
-            'video_list': videos
-        }
-        
 
     def search_video(self, handle, video_id):
         try:
@@ -84,7 +87,7 @@ class ScraperSearcher(BaseSearcher):
             }
             video_url = f'https://www.youtube.com/watch?v={video_id}'
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                video_info = ydl.extract_info(video_url, download=False)
+                video_info = self.replay.extract_info(ydl, video_url)
         except Exception as e:
             raise ValueError(f"No video found: {str(e)}")
         
@@ -127,14 +130,19 @@ class ScraperSearcher(BaseSearcher):
         parser = SubtitleParser()
 
         try:
-            response = requests.get(url)
-            transcript = parser.parse_transcript(response.text, fmt)
-            return transcript
-                
+            response = self.replay.get(url)
         except requests.RequestException as e:
             print(f"Error downloading transcript: {str(e)}")
-            # print(response.text[:100])
             return None
+        if not response.ok:
+            # try the next format or language
+            print(f"Error downloading transcript: HTTP {response.status_code}")
+            return None
+
+        # 429 and 5xx from replay.get propagate so the video fetch fails as throttled or erroring
+        try:
+            transcript = parser.parse_transcript(response.text, fmt)
+            return transcript
         except Exception as e:
             print(f"Error parsing transcript: {str(e)}")
             print(fmt)
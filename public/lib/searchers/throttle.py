@@ -0,0 +1,222 @@
+from contextlib import contextmanager
+import fcntl
+import json
+import os
+import time
+
+# error text that means a backend is out of quota or being throttled
+THROTTLE_SIGNALS = (
+    'quotaExceeded',
+    'rateLimitExceeded',
+    'userRateLimitExceeded',
+    'dailyLimitExceeded',
+    'HTTP Error 429',
+    'Too Many Requests',
+    "confirm you're not a bot",
+    'confirm you’re not a bot',
+)
+
+# error text that means the backend itself failed: transport, timeouts and 5xx
+BACKEND_SIGNALS = (
+    'HttpError 5',
+    'HTTP Error 5',
+    'timed out',
+    'Timeout',
+    'Connection',
+    'Unable to download webpage',
+    'Remote end closed',
+    'Temporary failure in name resolution',
+)
+
+def is_throttled(error):
+    message = str(error)
+    return any(signal in message for signal in THROTTLE_SIGNALS)
+
+def is_backend_error(error):
+    # anything else, like a private video or missing channel, is about the content, not the backend
+    if isinstance(error, OSError) or is_throttled(error):
+        return True
+    message = str(error)
+    return any(signal in message for signal in BACKEND_SIGNALS)
+
+class Throttle:
+    """Token bucket plus AIMD concurrency limit for one backend.
+
+    State lives in a json file under the cache directory and is updated under
+    an flock, so every gunicorn worker draws from the same bucket and shares
+    the same concurrency limit, in-flight count and backoff window.
+    """
+    def __init__(self, name, state_dir, rate=1.0, burst=5, initial_limit=2, min_limit=1, max_limit=8,
+                 base_backoff=5, max_backoff=300, max_events=50):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_events = max_events
+        os.makedirs(state_dir, exist_ok=True)
+        self.state_path = os.path.join(state_dir, f'{name}.json')
+        self.lock_path = os.path.join(state_dir, f'{name}.lock')
+        self.limit = initial_limit
+
+    @contextmanager
+    def _state(self):
+        with open(self.lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                state = self._load()
+                yield state
+                self.limit = state['limit']
+                # readers outside the lock must never see a half written file
+                tmp_path = f'{self.state_path}.{os.getpid()}'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(state, f)
+                os.replace(tmp_path, self.state_path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _load(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except:
+            return {
+                'tokens': self.burst,
+                'updated': time.time(),
+                'limit': self.initial_limit,
+                'backoff': 0,
+                'backoff_until': 0,
+                'seq': 0,
+                'events': [],
+                'inflight': {}
+            }
+
+    def _event(self, state, event, **details):
+        state['seq'] += 1
+        state['events'].append({
+            'seq': state['seq'],
+            'event': event,
+            'backend': self.name,
+            'time': time.time(),
+            'limit': int(state['limit']),
+            **details
+        })
+        del state['events'][:-self.max_events]
+
+    def acquire(self):
+        """Blocks until a token is available and no backoff is in effect"""
+        # only time spent in a backoff window is reported, plain token refills are normal pacing
+        backed_off = 0
+        while True:
+            with self._state() as state:
+                now = time.time()
+                state['tokens'] = min(self.burst, state['tokens'] + (now - state['updated']) * self.rate)
+                state['updated'] = now
+                if state['backoff_until'] > now:
+                    delay = state['backoff_until'] - now
+                    backed_off += delay
+                elif state['tokens'] >= 1:
+                    state['tokens'] -= 1
+                    if backed_off:
+                        self._event(state, 'backoff', waited=round(backed_off, 1))
+                    return
+                else:
+                    delay = (1 - state['tokens']) / self.rate
+            time.sleep(delay)
+
+    @contextmanager
+    def slot(self, reserve=0):
+        """Holds one of the current concurrency slots and one token for the duration of a fetch"""
+        pid = str(os.getpid())
+        while not self._take_slot(pid, reserve):
+            time.sleep(0.1)
+        try:
+            self.acquire()
+            yield
+        finally:
+            with self._state() as state:
+                inflight = state.setdefault('inflight', {})
+                inflight[pid] = inflight.get(pid, 1) - 1
+                if inflight[pid] <= 0:
+                    del inflight[pid]
+
+    def _take_slot(self, pid, reserve):
+        with self._state() as state:
+            # in-flight counts are kept per worker so a dead worker's slots can be reclaimed
+            inflight = state.setdefault('inflight', {})
+            for other in list(inflight):
+                if not self._alive(int(other)):
+                    del inflight[other]
+            total = sum(inflight.values())
+            # low priority callers keep `reserve` slots free, but still run when the backend is idle
+            if total >= int(state['limit']) - reserve and (total or not reserve):
+                return False
+            inflight[pid] = inflight.get(pid, 0) + 1
+            return True
+
+    def _alive(self, pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def record_success(self):
+        with self._state() as state:
+            # additive increase: roughly one extra slot per window of successes
+            state['limit'] = min(self.max_limit, state['limit'] + 1 / state['limit'])
+            state['backoff'] = 0
+
+    def record_throttle(self, reason):
+        with self._state() as state:
+            now = time.time()
+            if state['backoff_until'] > now:
+                # fetches already in flight when the throttle hit count as one signal
+                return
+            # multiplicative decrease plus an exponential backoff window
+            state['limit'] = max(self.min_limit, state['limit'] / 2)
+            state['backoff'] = min(self.max_backoff, state['backoff'] * 2 or self.base_backoff)
+            state['backoff_until'] = now + state['backoff']
+            self._event(state, 'throttle', backoff=state['backoff'], reason=reason[:200])
+
+    def last_seq(self):
+        return self._load()['seq']
+
+    def events_since(self, seq):
+        return [e for e in self._load()['events'] if e['seq'] > seq]
+
+    def status(self):
+        state = self._load()
+        return {
+            'limit': int(state['limit']),
+            'inflight': sum(state.get('inflight', {}).values()),
+            'tokens': round(state['tokens'], 2),
+            'backoff_until': state['backoff_until'],
+            'events': state['events'][-10:]
+        }
+
+class Slots:
+    """A fixed number of slots shared across workers, each one an flock on its own file"""
+    def __init__(self, name, state_dir, count):
+        os.makedirs(state_dir, exist_ok=True)
+        self.paths = [os.path.join(state_dir, f'{name}-{i}.lock') for i in range(count)]
+
+    def acquire(self):
+        """Returns a held slot, or None when every slot is busy"""
+        for path in self.paths:
+            lock = open(path, 'a')
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return lock
+            except BlockingIOError:
+                lock.close()
+        return None
+
+    def release(self, lock):
+        fcntl.flock(lock, fcntl.LOCK_UN)
+        lock.close()
@@ -0,0 +1,107 @@
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import argparse
+import http.client
+import itertools
+import json
+import threading
+import time
+
+# Load test driver for /search. Run it against a server started with
+# YOUTUBE_STANDIN_URL set, or pass --serve to host wsgi.py in this process.
+
+def percentile(samples, p):
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+def run_search(url, payload):
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=600)
+    result = {
+        'first_match': None,
+        'duration': None,
+        'videos': 0,
+        'matches': 0,
+        'errors': 0,
+        'throttles': 0,
+        'failed': False
+    }
+    start = time.monotonic()
+    try:
+        conn.request('POST', '/search', body=json.dumps(payload), headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        for line in response:
+            if not line.strip():
+                continue
+            message = json.loads(line)
+            if message['type'] == 'match':
+                result['matches'] += 1
+                if result['first_match'] is None:
+                    result['first_match'] = time.monotonic() - start
+            elif message['type'] == 'progress':
+                result['videos'] = message['videos_processed']
+            elif message['type'] == 'error':
+                result['errors'] += 1
+            elif message['type'] == 'throttle':
+                result['throttles'] += 1
+    except Exception as e:
+        print(f"Request failed: {str(e)}")
+        result['failed'] = True
+    finally:
+        conn.close()
+    result['duration'] = time.monotonic() - start
+    return result
+
+def serve_in_process(port):
+    from werkzeug.serving import make_server
+    from wsgi import app
+
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{port}'
+
+def report(results, elapsed):
+    def fmt(value):
+        return '-' if value is None else f'{value:.3f}s'
+
+    durations = [r['duration'] for r in results if not r['failed']]
+    first_matches = [r['first_match'] for r in results if r['first_match'] is not None]
+    videos = sum(r['videos'] for r in results)
+
+    print(f"requests:         {len(results)} ({sum(r['failed'] for r in results)} failed)")
+    print(f"elapsed:          {elapsed:.2f}s")
+    print(f"throughput:       {len(results) / elapsed:.2f} searches/s, {videos / elapsed:.1f} videos/s")
+    print(f"matches:          {sum(r['matches'] for r in results)}")
+    print(f"error lines:      {sum(r['errors'] for r in results)}")
+    print(f"throttle events:  {sum(r['throttles'] for r in results)}")
+    for name, samples in [('first match', first_matches), ('total', durations)]:
+        print(f"{name + ':':<18}p50 {fmt(percentile(samples, 50))}  p95 {fmt(percentile(samples, 95))}"
+              f"  p99 {fmt(percentile(samples, 99))}  max {fmt(max(samples, default=None))}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Run concurrent streaming /search requests and report latency')
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--serve', action='store_true', help='host wsgi.py in this process instead of using --url')
+    parser.add_argument('--port', type=int, default=8001, help='port for --serve')
+    parser.add_argument('--handles', nargs='+', required=True)
+    parser.add_argument('--terms', nargs='+', required=True)
+    parser.add_argument('--type', default='apikey')
+    parser.add_argument('--order', default='channel', choices=['channel', 'cache_first'])
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--requests', type=int, default=100)
+    args = parser.parse_args()
+
+    url = serve_in_process(args.port) if args.serve else args.url
+    # cycle through every (handle, term) pair so the mix of cached and uncached work is repeatable
+    pairs = itertools.islice(itertools.cycle(itertools.product(args.handles, args.terms)), args.requests)
+    payloads = [{'handle': h, 'term': t, 'type': args.type, 'order': args.order} for h, t in pairs]
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda payload: run_search(url, payload), payloads))
+    report(results, time.monotonic() - start)
+
+if __name__ == '__main__':
+    main()
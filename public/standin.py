@@ -0,0 +1,93 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+from lib.searchers.replay import Recording, request_key, ytdlp_key
+import argparse
+import json
+import random
+import time
+
+# Local stand-in for YouTube, serving responses captured with YOUTUBE_RECORD_DIR.
+# Point the app at it with YOUTUBE_STANDIN_URL=http://127.0.0.1:8765
+
+THROTTLED_BODY = json.dumps({
+    'error': {
+        'code': 429,
+        'message': 'Too Many Requests',
+        'errors': [{'reason': 'rateLimitExceeded', 'message': 'Too Many Requests'}]
+    }
+})
+
+class StandinHandler(BaseHTTPRequestHandler):
+    # set by main()
+    recording = None
+    latency = 0
+    jitter = 0
+    error_rate = 0
+    throttle_rate = 0
+
+    def do_GET(self):
+        self._serve()
+
+    def do_POST(self):
+        self._serve()
+
+    def _key(self):
+        parts = urlsplit(self.path)
+        params = parse_qs(parts.query)
+        if parts.path == '/ytdlp':
+            return ytdlp_key(params['url'][0], process=params.get('process', ['1'])[0] == '1')
+        if parts.path == '/fetch':
+            return request_key('GET', params['url'][0])
+        return request_key(self.command, self.path)
+
+    def _serve(self):
+        time.sleep(max(0, random.gauss(self.latency, self.jitter)))
+
+        roll = random.random()
+        if roll < self.throttle_rate:
+            return self._send(429, 'application/json', THROTTLED_BODY)
+        if roll < self.throttle_rate + self.error_rate:
+            return self._send(500, 'text/plain', 'Internal Server Error')
+
+        try:
+            recorded = self.recording.load(self._key())
+        except KeyError:
+            recorded = None
+        if not recorded:
+            return self._send(404, 'text/plain', 'Not recorded')
+        self._send(recorded['status'], recorded['content_type'] or 'application/octet-stream', recorded['body'])
+
+    def _send(self, status, content_type, body):
+        body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve recorded YouTube responses locally')
+    parser.add_argument('recording', help='directory captured with YOUTUBE_RECORD_DIR')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.2, help='mean response delay in seconds')
+    parser.add_argument('--jitter', type=float, default=0.1, help='standard deviation of the delay')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of requests answered with 500')
+    parser.add_argument('--throttle-rate', type=float, default=0, help='fraction of requests answered with 429')
+    args = parser.parse_args()
+
+    StandinHandler.recording = Recording(args.recording)
+    StandinHandler.latency = args.latency
+    StandinHandler.jitter = args.jitter
+    StandinHandler.error_rate = args.error_rate
+    StandinHandler.throttle_rate = args.throttle_rate
+
+    server = ThreadingHTTPServer((args.host, args.port), StandinHandler)
+    print(f"Serving {args.recording} on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+if __name__ == '__main__':
+    main()